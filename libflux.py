@@ -19,28 +19,242 @@ import pickle
 import time
 import collections
 import sys
-import itertools
+import functools
 import cvxopt, cvxopt.solvers
+import sklearn.svm
+import quadprog
+
+
+@functools.lru_cache(maxsize=1)
+def _get_models():
+    """Load the 29 regression models once, keyed by influx ID"""
+    with open("models_svm.p", "rb") as F:
+        return pickle.load(F)
+
+@functools.lru_cache(maxsize=1)
+def _get_feature_scalers():
+    """Load the feature scalers once, keyed by influx ID"""
+    with open("feature_scalers.p", "rb") as F:
+        return pickle.load(F)
+
+@functools.lru_cache(maxsize=1)
+def _get_encoders():
+    """Load the one-hot encoders once, keyed by influx ID"""
+    with open("encoders.p", "rb") as F:
+        return pickle.load(F)
+
+@functools.lru_cache(maxsize=1)
+def _get_label_scalers():
+    """Load the label scalers once, keyed by influx ID"""
+    with open("label_scalers.p", "rb") as F:
+        return pickle.load(F)
+
+@functools.lru_cache(maxsize=1)
+def _get_preprocessing():
+    """Precompute the preprocessing shared by the 29 models from the pickled encoders and scalers
 
+    Returns
+    =========
+    Encoder_groups: list of 3-tuples (Categories, Offsets, vIDs). Models whose one-hot encoders share the same
+                    categories are grouped so that one-hot encoding is done once per group, see _onehot.
+    Feature_means: dict, keys are vIDs and values are 1-D arrays, StandardScaler.mean_ of each model
+    Feature_scales: dict, keys are vIDs and values are 1-D arrays, StandardScaler.scale_ of each model
+    Label_mins: 1-D array of 29 floats, forward offsets of the label scalers, i.e., MinMaxScaler.min_
+    Label_scales: 1-D array of 29 floats, forward multipliers of the label scalers, i.e., MinMaxScaler.scale_
+    Label_scale_squares: 1-D array of 29 floats, squared scale_ of the label scalers, the diagonal of P in quadprog_adjust
+    Notes
+    ========
+    Encoders are fitted per influx in get_model.py, so not all of them have the same categories.
+    Labels are scaled as Scaled = Flux * Label_scales + Label_mins, thus
+    Flux = (Scaled - Label_mins) / Label_scales, same as MinMaxScaler.inverse_transform.
+    """
+    Encoders = _get_encoders()
+    Feature_scalers = _get_feature_scalers()
+    Label_scalers = _get_label_scalers()
+
+    Encoder_groups = collections.OrderedDict()
+    for vID, Encoder in Encoders.items():
+        Key = tuple(tuple(Category) for Category in Encoder.categories_)
+        if Key not in Encoder_groups:
+            Offsets = numpy.cumsum([0] + [len(Category) for Category in Encoder.categories_])
+            Encoder_groups[Key] = (Encoder.categories_, Offsets, [])
+        Encoder_groups[Key][2].append(vID)
+    Encoder_groups = list(Encoder_groups.values())
+
+    Feature_means = {vID: Scaler.mean_ for vID, Scaler in Feature_scalers.items()}
+    Feature_scales = {vID: Scaler.scale_ for vID, Scaler in Feature_scalers.items()}
+
+    Label_mins, Label_scales = [], []
+    for i in range(1, 29+1):
+        Scaler = Label_scalers[i]
+        if hasattr(Scaler, "min_"): # MinMaxScaler
+            Label_mins.append(Scaler.min_[0])
+            Label_scales.append(Scaler.scale_[0])
+        else: # StandardScaler, Scaled = (Flux - mean_) / scale_
+            Label_mins.append(-Scaler.mean_[0] / Scaler.scale_[0])
+            Label_scales.append(1. / Scaler.scale_[0])
+    Label_scale_squares = numpy.array([Label_scalers[i].scale_[0] for i in range(1, 29+1)])**2
+
+    return Encoder_groups, Feature_means, Feature_scales, numpy.array(Label_mins), numpy.array(Label_scales), Label_scale_squares
+
+def _onehot(Categorical_features, Categories, Offsets):
+    """One-hot encode categorical features, same as OneHotEncoder.transform with handle_unknown='error'
+
+    Parameters
+    ============
+    Categorical_features: list of floats, the categorical part of the feature vector
+    Categories: list of sorted 1-D arrays, OneHotEncoder.categories_
+    Offsets: 1-D array of ints, Offsets[j] is the position of the first category of feature j in the output,
+             Offsets[-1] is the output size
+    Returns
+    =========
+    One_hot: 1-D array of 0s and 1s
+    """
+    One_hot = numpy.zeros(Offsets[-1])
+    for j, (Value, Category) in enumerate(zip(Categorical_features, Categories)):
+        Position = numpy.searchsorted(Category, Value)
+        if Position == len(Category) or Category[Position] != Value:
+            raise ValueError("Found unknown categories [%s] in column %d during transform" % (Value, j))
+        One_hot[Offsets[j] + Position] = 1
+    return One_hot
+
+@functools.lru_cache(maxsize=1)
+def _get_rbf_svrs():
+    """Stack the support vectors of all RBF-kernel SVR models so that the 29 models are evaluated at once
+
+    Returns
+    =========
+    Other_vIDs: list of vIDs whose models are not RBF-kernel SVRs, these are evaluated by their own predict()
+    Support_vectors: 2-D array, support vectors of all RBF-kernel models, zero-padded to Width columns
+    Model_index: 1-D int array, 0-indexed influx (vID-1) that each row of Support_vectors belongs to
+    Gammas: 1-D array, kernel coefficient of the model that each support vector belongs to
+    Dual_coefs: 1-D array, dual coefficient of each support vector
+    Intercepts: 1-D array of 29 floats, intercepts of the models, 0 for models in Other_vIDs
+    Width: int, the largest number of features among all models
+    Notes
+    ========
+    An RBF-kernel SVR predicts f(x) = sum_i Dual_coef_i * exp(-gamma * ||x - SV_i||^2) + intercept.
+    Zero padding does not change ||x - SV_i||^2 as long as x is zero-padded the same way.
+    """
+    Models = _get_models()
+    Width = max(Model.n_features_in_ for Model in Models.values())
 
-def quadprog_adjust(Substrates, Fluxes, Boundary_dict, pushLastWords, Debug=False, Label_scalers=None):
+    Other_vIDs = []
+    Support_vectors, Model_index, Gammas, Dual_coefs = [], [], [], []
+    Intercepts = numpy.zeros(29)
+    for vID, Model in Models.items():
+        if not (isinstance(Model, sklearn.svm.SVR) and Model.kernel == "rbf"):
+            Other_vIDs.append(vID)
+            continue
+        Num_SVs, Num_features = Model.support_vectors_.shape
+        Padded = numpy.zeros((Num_SVs, Width))
+        Padded[:, :Num_features] = Model.support_vectors_
+        Support_vectors.append(Padded)
+        Model_index.append(numpy.full(Num_SVs, vID-1))
+        Gammas.append(numpy.full(Num_SVs, Model._gamma))
+        Dual_coefs.append(Model.dual_coef_[0])
+        Intercepts[vID-1] = Model.intercept_[0]
+
+    if Support_vectors:
+        Support_vectors, Model_index, Gammas, Dual_coefs = map(numpy.concatenate, [Support_vectors, Model_index, Gammas, Dual_coefs])
+    else:
+        Support_vectors, Model_index, Gammas, Dual_coefs = numpy.zeros((0, Width)), numpy.zeros(0, dtype=int), numpy.zeros(0), numpy.zeros(0)
+
+    return Other_vIDs, Support_vectors, Model_index, Gammas, Dual_coefs, Intercepts, Width
+
+
+_SUBSTRATE2INDEX = {"glucose":0, "galactose":2, "fructose":1, "gluconate":3, "glutamate":4, "citrate":5, "xylose":6, "succinate":7, "malate":8, "lactate":9, "pyruvate":10, "glycerol":11, "acetate":12}
+
+# Substrates whose total ratio decides whether the organic acid inequalities apply, see quadprog_adjust
+_ORGANIC_ACID_INDEXES = [_SUBSTRATE2INDEX[Name] for Name in ("lactate", "glutamate", "acetate", "citrate", "pyruvate")]
+
+# Upper and lower boundaries of the 29 fluxes
+_UBS = numpy.array([100,99.5,99.3,99.3,216.6,
+       196.2,232,213.1,135,151.4,
+       113.7,94.1,41.2,47.5,71,
+       47.5,189,189,189,194,
+       194,194,181.5,55,148,
+       193.2,151,149.8,104.2043714], dtype=numpy.float64)
+
+_LBS = numpy.array([0,-99.9,-51.5,-51.5,-13.5,
+       -23.3,-36,-7.9,-144,0,
+       0,-33,-94.4,-2,-6.6,
+       -2,0,-0.1,-0.1,0,
+       -105,-106,-144.3,0,0,
+       0,-100,-67.60986805,-13.5], dtype=numpy.float64)
+
+# Names of user-set boundaries, i.e., lb1, ..., lb29, ub1, ..., ub29
+_FEATURE_NAMES = tuple("".join([Bound, str(ID)]) for Bound in ("lb", "ub") for ID in range(1, 29+1))
+
+# Nonzero entries of the stoichiometric constraints in quadprog_adjust, as 0-indexed (row, column, value).
+# Column j is flux v_{j+1}. In our paper the inequalities are Ax>=b but in the standardized formulation
+# it is Ax<=b, so values of _AINEQ_TRIPLETS are already negated.
+_AINEQ_TRIPLETS = [
+    (0, 0, -1), (0, 1, 1), (0, 9, 1),
+    (1, 1, -1), (1, 2, 1), (1, 15, -2),
+    (2, 2, -1), (2, 3, -1), (2, 4, 1), (2, 13, -1), (2, 24, -1),
+    (3, 4, -1), (3, 5, 1),
+    (5, 6, -1), (5, 7, 1), (5, 24, -1), (5, 26, 1), (5, 28, -1),
+    (6, 7, -1), (6, 8, 1), (6, 16, 1), (6, 23, 1), (6, 25, 1),
+    (7, 12, -1), (7, 13, 1),
+    (8, 15, -1), (8, 14, 1),
+    (9, 18, -1), (9, 19, 1),
+    (10, 22, -1), (10, 16, 1), (10, 27, -1),
+    (11, 20, 1), (11, 21, -1),
+]
+# Row 4 of Aineq, only enforced when lactate, glutamate, acetate, citrate and pyruvate make up at least half of the substrates
+_AINEQ_TRIPLETS_ORGANIC_ACIDS = [(4, 5, -1), (4, 6, 1), (4, 27, 1)]
+_AEQ_TRIPLETS = [
+    (0, 0, 1),
+    (1, 2, 1), (1, 3, -1),
+    (2, 10, 1), (2, 11, -1), (2, 12, -1),
+    (3, 13, 1), (3, 15, -1),
+    (4, 9, 1), (4, 10, -1), (4, 24, -1),
+    (5, 17, 1), (5, 16, -1),
+    (6, 14, 1), (6, 11, -1), (6, 13, 1),
+    (7, 23, 1), (7, 17, -1), (7, 18, 1),
+    (8, 21, -1), (8, 22, 1), (8, 23, -1), (8, 28, 1),
+    (9, 19, 1), (9, 23, 1), (9, 20, -1),
+]
+
+
+def _dense_from_triplets(Triplets, Shape):
+    """Build a dense matrix from 0-indexed (row, column, value) triplets"""
+    M = numpy.zeros(Shape)
+    for Row, Column, Value in Triplets:
+        M[Row, Column] = Value
+    return M
+
+_AINEQ = _dense_from_triplets(_AINEQ_TRIPLETS, (12, 29))
+_AINEQ_ORGANIC_ACIDS = _dense_from_triplets(_AINEQ_TRIPLETS + _AINEQ_TRIPLETS_ORGANIC_ACIDS, (12, 29))
+_AEQ = _dense_from_triplets(_AEQ_TRIPLETS, (10, 29))
+
+_QP_OPTIONS = {'show_progress': False}
+
+def _cm(A):
+    """Convert a numpy array to a dense cvxopt matrix of doubles"""
+    return cvxopt.matrix(numpy.ascontiguousarray(A, dtype=numpy.float64), tc='d')
+
+def quadprog_adjust(Substrates, Fluxes, Boundary_dict, pushLastWords, Debug=False, Label_scalers=None, Label_scale_squares=None):
     """adjust values from ML
     Parameters
     ============
-    Substrates: OrderedDict, keys as integers and values as floats, e.g., {1:0.25, 2:0, 3:0.75, ...}
-    Fluxes: Dict, keys as integers and values as floats, e.g., {1:99.5, 2:1.1, ...}
+    Substrates: 1-D array of 14 floats, ratios of substrates, e.g., [0.25, 0, 0.75, ...]
+    Fluxes: 1-D array of 29 floats, Fluxes[i] is v_{i+1}, e.g., [99.5, 1.1, ...]
     Debug: Boolean, True for showing debug info and False (default) for no.
     Label_scaler: sklearn.preprocessing.standardScaler or .MinMaxScaler
                   Forward transform is from fluxes in true range to scaled range
                   Inverse transform is from scaled range to true range
     Boundary_dict: Upper boundaries and lower boundaries for 29 fluxes, depending on user inputs,
                    e.g., {"lb29":999, "ub8":50}, populate ub and lb inequalities from them
+    Label_scale_squares: 1-D array of 29 floats, Label_scalers[i+1].scale_[0]**2 precomputed, see _get_preprocessing
+                         If None (default), computed from Label_scalers
     Returns
     =========
-     Solution: Dict, keys as integers and values as floats, e.g., {1:99.5, 2:1.1, ...}
+     Solution: 1-D numpy array of 29 floats, Solution[i] is v_{i+1}, e.g., [99.5, 1.1, ...]
     Notes
     ========
-    In Substrates, the mapping from keys to real chemicals is as follows:
+    In Substrates, the mapping from indexes (plus 1) to real chemicals is as follows:
         1. Glucose
         2. Fructose
         3. Galactose
@@ -64,12 +278,19 @@ def quadprog_adjust(Substrates, Fluxes, Boundary_dict, pushLastWords, Debug=Fals
 	* b, -lb, ub => h (coefficients for constant terms in inequality constraints)
     * Aeq => A
     * Beq => b
+    The QP is solved by quadprog (Goldfarb-Idnani active set method), which minimizes 1/2 x^T G x - a^T x
+    subject to C^T x >= b where the first meq constraints are equalities, thus
+    * P => G
+    * -q => a
+    * [Aeq; -Aineq] => C^T
+    * [beq; -bineq] => b
+    cvxopt is only used when quadprog finds the constraints inconsistent, e.g., for infeasible boundaries.
     Unimplemented features:
     1. Using scaled values for quadprog
     Example
     ============
-    >>> Substrates = {1:1, 2:0, 3:0, 4:0, 5:0, 6:0, 7:0, 8:0, 9:0, 10:0, 11:0, 12:0, 13:0, 14:0}
-    >>> Fluxes = {1: 100.0, 2: -2.7159, 3: 15.2254, 4: 17.7016, 5: 110.9973, 6: 91.8578, 7: 137.7961, 8: 91.1558, 9: -0.7373, 10: 94.1518, 11: 24.1126, 12: 21.231, 13: 2.8816, 14: 11.0324, 15: 10.1986, 16: 11.0324, 17: 79.4203, 18: 79.4203, 19: 67.9442, 20: 67.8806, 21: 79.3567, 22: 79.3567, 23: 64.0876, 24: 11.4761, 25: 70.0392, 26: -1.2424, 27: 0.0059, 28: 23.2159, 29: 26.7451}
+    >>> Substrates = numpy.array([1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0], dtype=float)
+    >>> Fluxes = [100.0, -2.7159, 15.2254, 17.7016, 110.9973, 91.8578, 137.7961, 91.1558, -0.7373, 94.1518, 24.1126, 21.231, 2.8816, 11.0324, 10.1986, 11.0324, 79.4203, 79.4203, 67.9442, 67.8806, 79.3567, 79.3567, 64.0876, 11.4761, 70.0392, -1.2424, 0.0059, 23.2159, 26.7451]
     >>> import libflux
     >>> libflux.quadprog_adjust(Substrates, Fluxes, {}, Debug=True)
     >>> import cPickle
@@ -79,137 +300,78 @@ def quadprog_adjust(Substrates, Fluxes, Boundary_dict, pushLastWords, Debug=Fals
     """
 
 
-    Substrate2Index= {"glucose":1, "galactose":3, "fructose":2, "gluconate":4, "glutamate":5, "citrate":6, "xylose":7, "succinate":8, "malate":9, "lactate":10, "pyruvate":11, "glycerol":12, "acetate":13}
-
-    Ubs = numpy.array([[100,99.5,99.3,99.3,216.6,
-           196.2,232,213.1,135,151.4,
-           113.7,94.1,41.2,47.5,71,
-           47.5,189,189,189,194,
-           194,194,181.5,55,148,
-           193.2,151,149.8,104.2043714]])
-    Ubs = Ubs.transpose() # turn it into column vector, 29x1
-
-    Lbs = numpy.array([[0,-99.9,-51.5,-51.5,-13.5,
-           -23.3,-36,-7.9,-144,0,
-           0,-33,-94.4,-2,-6.6,
-           -2,0,-0.1,-0.1,0,
-           -105,-106,-144.3,0,0,
-           0,-100,-67.60986805,-13.5]])
-    Lbs = Lbs.transpose() # turn it into column vector, 29x1
-
     Aineq_bound, Bineq_bound = populate_boundary_inequalities(Boundary_dict)
 
-    Aineq = numpy.zeros((12+1, 29+1)) # the plus 1 is to tackle MATLAB 1-index
-    Aineq[1,1] = 1; Aineq[1,2] = -1; Aineq[1,10] = -1;
-#    Aineq[2,2] = 1;Aineq[2,3] = -1; Aineq[2,15] = 1; Aineq[2,16] = 1;
-#    Aineq[3,3] = 1; Aineq[3,4] = 1; Aineq[3,5] = -1;Aineq[3,14] = 1; Aineq[3,15] = 1; Aineq[3,16] = 1; Aineq[3,25] = 1;
-    Aineq[2,2] = 1;Aineq[2,3] = -1; Aineq[2,16] = 2;
-    Aineq[3,3] = 1; Aineq[3,4] = 1; Aineq[3,5] = -1;Aineq[3,14] = 1; Aineq[3,25] = 1;
-    Aineq[4,5] = 1; Aineq[4,6] = -1;
-
-    if Substrates[Substrate2Index["lactate"]] + Substrates[Substrate2Index["glutamate"]] + \
-            Substrates[Substrate2Index["acetate"]] + Substrates[Substrate2Index["citrate"]] + \
-            Substrates[Substrate2Index["pyruvate"]] >= 0.5:
-        Aineq[5,6] = 1; Aineq[5,7] = -1; Aineq[5,28] = -1;
-
-#    Aineq[5,6] = 1; Aineq[5,7] = -1; Aineq[5,28] = -1;
-    Aineq[6,7] = 1; Aineq[6,8] = -1; Aineq[6,25] = 1;Aineq[6,27] = -1; Aineq[6,29] = 1;
-    Aineq[7,8] = 1; Aineq[7,9] = -1; Aineq[7,17] = -1;Aineq[7,24] = -1; Aineq[7,26] = -1;
-    Aineq[8,13] = 1; Aineq[8,14] = -1;
-    Aineq[9,16] = 1; Aineq[9,15] = -1;
-    Aineq[10,19] = 1; Aineq[10,20] = -1;
-    Aineq[11,23] = 1; Aineq[11,17] = -1;Aineq[11,28] = 1;
-    Aineq[12,21] = -1; Aineq[12,22] = 1;
-    Aineq = Aineq[1:, 1:] # convert 1-index to 0-index
-    Aineq = -1 * Aineq # because in standarized formulation, it's Ax<=b but in our paper it is Ax>=b
+    Organic_acids = Substrates[_ORGANIC_ACID_INDEXES].sum() >= 0.5
+
+    Aineq = _AINEQ_ORGANIC_ACIDS if Organic_acids else _AINEQ # module constants, never modified in place
 
 #    if Label_scalers == None: # if flux in their true range instead of scaled range
 #        Aineq = numpy.vstack([Aineq, -numpy.eye(29), numpy.eye(29)]) # add eye matrixes for Lbs and Ubs
 
     if not Aineq_bound is None :
         Aineq = numpy.vstack([Aineq, Aineq_bound])
-    else:
-        Aineq = numpy.matrix(Aineq)
 
 
-    bineq = numpy.zeros((12+1, 1+1))
-    bineq[2,1]= 100 * Substrates[Substrate2Index["fructose"]]
-    bineq[6,1]= 100 * Substrates[Substrate2Index["pyruvate"]]
-    bineq[10,1] = 100 * Substrates[Substrate2Index["glutamate"]]
-    bineq = bineq[1:, 1:] # convert 1-index to 0-index
+    bineq = numpy.zeros(12)
+    bineq[1] = 100 * Substrates[_SUBSTRATE2INDEX["fructose"]]
+    bineq[5] = 100 * Substrates[_SUBSTRATE2INDEX["pyruvate"]]
+    bineq[9] = 100 * Substrates[_SUBSTRATE2INDEX["glutamate"]]
 
 #    if Label_scalers == None: # if flux in their true range instead of scaled range
 #        bineq = numpy.vstack([bineq, -Lbs, Ubs])
     if not Bineq_bound is None:
-        bineq = numpy.vstack([bineq, Bineq_bound])
-    else:
-        bineq = numpy.matrix(bineq)
-
-    Aeq = numpy.zeros((10+1, 29+1))
-    Aeq[1,1] = 1;
-    Aeq[2,3] = 1; Aeq[2,4] = -1;
-    Aeq[3,11] = 1; Aeq[3,12] = -1; Aeq[3,13] = -1;
-    Aeq[4,14] = 1; Aeq[4,16] = -1;
-    Aeq[5,10] = 1; Aeq[5,11] = -1; Aeq[5,25] = -1;
-    Aeq[6,18] = 1; Aeq[6,17] = -1;
-    Aeq[7,15] = 1; Aeq[7,12] = -1; Aeq[7,14] = 1;
-    Aeq[8,24] = 1; Aeq[8,18] = -1; Aeq[8,19] = 1;
-    Aeq[9,22] = -1; Aeq[9,23] = 1; Aeq[9,24] = -1; Aeq[9,29] = 1;
-    Aeq[10,20] = 1; Aeq[10,24] = 1;Aeq[10,21] = -1;
-    Aeq = Aeq[1:, 1:] # convert 1-index to 0-index
-    Aeq = numpy.matrix(Aeq)
-#    Aeq = Aeq.transpose().tolist()
-
-    beq = numpy.zeros((10+1,1+1))
-    beq[1,1] = 100 * (Substrates[Substrate2Index["glucose"]] + Substrates[Substrate2Index["galactose"]])
-    beq[2,1] = -100 * Substrates[Substrate2Index["glycerol"]]
-    beq[5,1] = -100 * Substrates[Substrate2Index["gluconate"]]
-    beq[6,1] = 100 * Substrates[Substrate2Index["citrate"]]
-    beq[7,1] = 100 * Substrates[Substrate2Index["xylose"]]
-    beq[9,1] = 100 * Substrates[Substrate2Index["malate"]]
-    beq[10,1]= -100 * Substrates[Substrate2Index["succinate"]]
-    beq = beq[1:, 1:] # convert 1-index to 0-index
-    beq = numpy.matrix(beq)
-
-    if Label_scalers is None:
-        P = numpy.eye((29))
-        q = [[Fluxes[i] for i in range(1, 29+1)]]
-    else: # convert non-scaled fluxes into [0,1]
-        P = numpy.square(numpy.diag([Label_scalers[i].scale_[0] for i in range(1, 29+1)]))
-        q = [[Label_scalers[i].scale_**2 * Fluxes[i] for i in range(1, 29+1)]]
-        if Debug:
-            for i in range(1,29+1):
-                pass
-
-    q = -1*numpy.array(q).transpose() # -1 is because -v_i but f.T*x in standard quadprog formalization
+        bineq = numpy.concatenate([bineq, Bineq_bound.ravel()])
 
-#    print (list(map(numpy.shape, [Aineq, bineq, Aeq, beq, P, q])))
+    Aeq = _AEQ
 
-    q = q.ravel().reshape(-1, 1) # line added 2022-7-1
+    beq = numpy.zeros(10)
+    beq[0] = 100 * (Substrates[_SUBSTRATE2INDEX["glucose"]] + Substrates[_SUBSTRATE2INDEX["galactose"]])
+    beq[1] = -100 * Substrates[_SUBSTRATE2INDEX["glycerol"]]
+    beq[4] = -100 * Substrates[_SUBSTRATE2INDEX["gluconate"]]
+    beq[5] = 100 * Substrates[_SUBSTRATE2INDEX["citrate"]]
+    beq[6] = 100 * Substrates[_SUBSTRATE2INDEX["xylose"]]
+    beq[8] = 100 * Substrates[_SUBSTRATE2INDEX["malate"]]
+    beq[9] = -100 * Substrates[_SUBSTRATE2INDEX["succinate"]]
 
-    [Aineq, bineq, Aeq, beq, P, q] = map(cvxopt.matrix, [Aineq, bineq, Aeq, beq, P, q])
+    if Label_scalers is None:
+        P_diag = numpy.ones(29)
+    else: # convert non-scaled fluxes into [0,1]
+        if Label_scale_squares is None:
+            Label_scale_squares = numpy.array([Label_scalers[i].scale_[0] for i in range(1, 29+1)])**2
+        P_diag = Label_scale_squares
+    Fluxes = numpy.asarray(Fluxes, dtype=numpy.float64)
+    q = -P_diag * Fluxes # -1 is because -v_i but f.T*x in standard quadprog formalization
 
-    cvxopt.solvers.options['show_progress'] = False
+    try:
+        Solution = quadprog.solve_qp(numpy.diag(P_diag), -q, numpy.vstack([Aeq, -Aineq]).T, numpy.concatenate([beq, -bineq]), meq=Aeq.shape[0])[0]
+    except ValueError as Error:
+        if "constraints are inconsistent" not in str(Error): # e.g., G not positive definite, a bug rather than bad inputs
+            raise
+        # constraints are inconsistent, e.g., infeasible user boundaries, fall back to cvxopt as before
+        # Dense G and A with the default KKT solver reproduce the original behavior on infeasible inputs.
+        # P is diagonal, so it is built directly as a sparse diagonal.
+        [Aineq, Aeq] = map(_cm, [Aineq, Aeq])
+        P = cvxopt.spmatrix(P_diag.tolist(), range(29), range(29), (29, 29))
+        [bineq, beq, q] = map(_cm, [bineq, beq, q])
 
-    Solv = cvxopt.solvers.qp(P, q, Aineq, bineq, Aeq, beq)
+        Solv = cvxopt.solvers.qp(P, q, Aineq, bineq, Aeq, beq, options=_QP_OPTIONS)
 
-    Solution = Solv['x']
+        Solution = Solv['x']
 
-    Solution = numpy.array(Solution)[:,0] # conversion from cvxopt's matrix to numpy array
+        Solution = numpy.array(Solution)[:,0] # conversion from cvxopt's matrix to numpy array
 
     if Debug:
 
         numpy.set_printoptions(precision=4, suppress=True)
 
-        pushLastWords("<pre>")
-        pushLastWords(("".join([" V", "   Adjusted ", " Predicted ", "   Diff  ",  "  Diff%  ", " Diff%Rg   "]) ))
+        Lines = ["<pre>", "".join([" V", "   Adjusted ", " Predicted ", "   Diff  ",  "  Diff%  ", " Diff%Rg   "])]
         for Idx, Value in enumerate(Solution):
-            Diff =  Value-Fluxes[Idx+1]
-            pushLastWords(("{0:2d}{1:10.3f}{2:10.3f}{3:10.3f}{4:8.1f}{5:8.1f}".\
-                  format(Idx+1, Value, Fluxes[Idx+1], Diff, Diff/Fluxes[Idx+1]*100,  Diff/((Ubs-Lbs)[Idx][0])*100) )) # convert from 0-index to 1-index
-        pushLastWords("</pre>")
-
-    Solution = {i+1: Solution[i] for i in range(29)} # turn from numpy array to dict
+            Diff =  Value-Fluxes[Idx]
+            Lines.append("{0:2d}{1:10.3f}{2:10.3f}{3:10.3f}{4:8.1f}{5:8.1f}".\
+                  format(Idx+1, Value, Fluxes[Idx], Diff, Diff/Fluxes[Idx]*100,  Diff/(_UBS[Idx]-_LBS[Idx])*100)) # convert from 0-index to 1-index
+        Lines.append("</pre>")
+        pushLastWords("\n".join(Lines))
 
     return Solution
 
@@ -219,7 +381,7 @@ def test(S):
 def print_influxes(Influxes, pushLastWords):
     """Print influxes
 
-    Influxes: dict, keys are influx id, values are floats
+    Influxes: 1-D array of 29 floats, Influxes[i] is v_{i+1}
     """
 
     import sys
@@ -240,10 +402,9 @@ def print_influxes(Influxes, pushLastWords):
 #    for x in range(5):
 #        print x
 
-    for ID, Value in Influxes.items():
-        pushLastWords("""\
+    pushLastWords("\n".join("""\
         v%s = %.4f, <br>
-        """ % (ID, Value))
+        """ % (ID, Value) for ID, Value in enumerate(Influxes, 1)))
 
     pushLastWords ("</td><td> <img src=\"https://mflux.cs.iastate.edu/static/centralflux.png\">  </td>        </tr>      </table>")
 
@@ -265,24 +426,20 @@ def populate_boundary_inequalities(Boundary_dict, Debug=False):
     if Boundary_dict == {}:
         return None, None
 
-    Row_vectors  = [] # must be 29 columns and X rows where X is the number of Ubs and Lbs set by user
-    Boundary_column_vectors = [] # X rows and 1 column
-    for Polarity_Id, Bound_value in Boundary_dict.items():
-        Bound_type, Flux_ID = Polarity_Id[:2], int(Polarity_Id[2:])
-        Row_vector = numpy.zeros(29)
-        if Bound_type == "lb":
-            Bound_value = -1*Bound_value
-            Row_vector[Flux_ID-1] = -1.
-        elif Bound_type == "ub":
-            Row_vector[Flux_ID-1] = 1.
-        else:
-            print("wrong boundary")
-        Row_vectors.append(Row_vector)
-        Boundary_column_vectors.append(Bound_value)
-#        print "<br>", Bound_type, Flux_ID, Bound_value
-
-    Aineq = numpy.vstack(Row_vectors)
-    Bineq = numpy.vstack(Boundary_column_vectors)
+    Polarity_Ids = list(Boundary_dict)
+    N = len(Polarity_Ids) # X rows where X is the number of Ubs and Lbs set by user
+    Types = numpy.array([Polarity_Id[:2] for Polarity_Id in Polarity_Ids])
+    Columns = numpy.array([int(Polarity_Id[2:])-1 for Polarity_Id in Polarity_Ids])
+    Bound_values = numpy.array([Boundary_dict[Polarity_Id] for Polarity_Id in Polarity_Ids], dtype=numpy.float64)
+
+    Valid = numpy.isin(Types, ("lb", "ub"))
+    if not Valid.all():
+        print("wrong boundary")
+    Signs = numpy.where(Types == "lb", -1., 1.) # rows of wrong boundaries are left as zeros in Aineq
+
+    Aineq = numpy.zeros((N, 29)) # must be 29 columns
+    Aineq[numpy.arange(N), Columns] = numpy.where(Valid, Signs, 0.)
+    Bineq = numpy.where(Valid, Signs * Bound_values, Bound_values).reshape(-1, 1) # X rows and 1 column
 
     if Debug:
         print("<pre>")
@@ -299,7 +456,7 @@ def process_boundaries(request, Substrates):
 
     Notes
     =======
-    In Substrates, the mapping from keys to real chemicals is as follows:
+    In Substrates, the mapping from indexes (plus 1) to real chemicals is as follows:
         1. Glucose
         2. Fructose
         3. Galactose
@@ -316,20 +473,17 @@ def process_boundaries(request, Substrates):
         14. NaHCO3
 
     """
-    Substrate2Index= {"glucose":1, "galactose":3, "fructose":2, "gluconate":4, "glutamate":5, "citrate":6, "xylose":7, "succinate":8, "malate":9, "lactate":10, "pyruvate":11, "glycerol":12, "acetate":13}
-    Feature_names = ["".join([Bound, ID]) for  (Bound, ID) in itertools.product(["lb", "ub"], list(map(str, list(range(1, 29+1))))) ]
-
     Features= {}
-    for Feature_name in Feature_names:
+    for Feature_name in _FEATURE_NAMES:
         Feature_value = request.values.get(Feature_name, 0)
         if Feature_value:
 #            print Feature_name, Feature_value
             Feature_value = html.escape(Feature_value)
             Features[Feature_name] = float(Feature_value) # convert all string to numbers
 
-    if Substrates[Substrate2Index["acetate"]] == 0:
+    if Substrates[_SUBSTRATE2INDEX["acetate"]] == 0:
         Features["lb9"] = 0
-    if Substrates[Substrate2Index["lactate"]] == 0:
+    if Substrates[_SUBSTRATE2INDEX["lactate"]] == 0:
         Features["lb27"] = 0
 
 #   for Feature_name in Feature_names:
@@ -341,7 +495,7 @@ def process_boundaries(request, Substrates):
 
 def process_input(Features, pushLastWords):
     """Process the result from CGI parsing to form feature vector including substrate matrixi
-    Substrates: OrderedDict, keys as integers and values as floats
+    Substrates: 1-D array of 14 floats, Substrates[i] is the ratio of substrate i+1 below
         1. Glucose
         2. Fructose
         3. Galactose
@@ -363,13 +517,13 @@ def process_input(Features, pushLastWords):
     Num_substrates = 14 # excluding other carbon
     # Generate substrate matrix
 
-    Substrates = collections.OrderedDict([(i,0) for i in range(1, Num_substrates+1)]) # substrate values, initialization
-    Substrates[int(Features["Substrate_first"])] += Features["Ratio_first"]
-    Substrates[int(Features["Substrate_sec"])] += Features["Ratio_sec"]
+    Substrates = numpy.zeros(Num_substrates) # substrate values, initialization
+    Substrates[int(Features["Substrate_first"])-1] += Features["Ratio_first"]
+    Substrates[int(Features["Substrate_sec"])-1] += Features["Ratio_sec"]
 
     # Form the feature vector
     Vector = [Features[Feature_name] for Feature_name in ["Species", "Reactor", "Nutrient", "Oxygen", "Method", "MFA", "Energy", "Growth_rate", "Substrate_uptake_rate"]]
-    Vector += [Substrates[i] for i in range(1, Num_substrates+1)]
+    Vector += Substrates.tolist()
     Vector.append(Features["Substrate_other"]) # Other carbon source
 
     # Print input check
@@ -387,52 +541,54 @@ def process_input(Features, pushLastWords):
     Substrate_names = ["glucose", "fructose", "galactose", "gluconate", "glutamate", "citrate", "xylose", "succinate", "malate", "lactate", "pyruvate", "glycerol", "acetate",  "NaHCO3"]
     Substrate_dict = collections.OrderedDict([(i+1,Name) for i, Name in enumerate(Substrate_names)])
 #    print "<p>Feature Vector (pre-one-hot-encoding and pre-scaling):", Vector, "</br>"
-#    print "in which the substrates ratios are:", [(Substrate_dict[Index],Ratio) for Index, Ratio in Substrates.iteritems()],
+#    print "in which the substrates ratios are:", [(Substrate_dict[Index],Ratio) for Index, Ratio in enumerate(Substrates, 1)],
 #    print "<br>Feature vector size is ", len(Vector), "</p>"
 
     return Vector, Substrates
 
 def rule_adjust(Influxes, Substrates):
     """Adjust influxes values using rules
+    Influxes: 1-D array of 29 floats, Influxes[i] is v_{i+1}, adjusted in place
     """
 
-    Substrate2Index= {"glucose":1, "galactose":3, "fructose":2, "gluconate":4, "glutamate":5, "citrate":6, "xylose":7, "succinate":8, "malate":9, "lactate":10, "pyruvate":11, "glycerol":12, "acetate":13}
-
     #Step 1: Compute dependent influxes
-#    Influxes[1] = 100 * Substrates[Substrate2Index["glucose"]]
+#    Influxes[1] = 100 * Substrates[_SUBSTRATE2INDEX["glucose"]]
 #    Influxes[13] = Influxes[11] - Influxes[12]
 #    Influxes[16] = Influxes[14]
-#    Influxes[25] = Influxes[10] - Influxes[11] + 100 * Substrates[Substrate2Index["gluconate"]]
-#    Influxes[18] = Influxes[17] + 100 * Substrates[Substrate2Index["citrate"]]
-#    Influxes[15] = Influxes[12] - Influxes[14] + 100 * Substrates[Substrate2Index["xylose"]]
+#    Influxes[25] = Influxes[10] - Influxes[11] + 100 * Substrates[_SUBSTRATE2INDEX["gluconate"]]
+#    Influxes[18] = Influxes[17] + 100 * Substrates[_SUBSTRATE2INDEX["citrate"]]
+#    Influxes[15] = Influxes[12] - Influxes[14] + 100 * Substrates[_SUBSTRATE2INDEX["xylose"]]
 #    Influxes[24] = Influxes[18] - Influxes[19]
-#    Influxes[21] = Influxes[20] + Influxes[24] + 100 * Substrates[Substrate2Index["succinate"]]
+#    Influxes[21] = Influxes[20] + Influxes[24] + 100 * Substrates[_SUBSTRATE2INDEX["succinate"]]
 #    Influxes[22] = Influxes[21]
-#    Influxes[29] = Influxes[22] + Influxes[24] - Influxes[23] + 100 * Substrates[Substrate2Index["malate"]]
+#    Influxes[29] = Influxes[22] + Influxes[24] - Influxes[23] + 100 * Substrates[_SUBSTRATE2INDEX["malate"]]
 
     # Step 2: Correct flux values
-    if Substrates[Substrate2Index["acetate"]] != 0:
-        Influxes[9] = -100 * Substrates[Substrate2Index["acetate"]]
-    if Substrates[Substrate2Index["lactate"]] != 0:
-        Influxes[27] = -100 * Substrates[Substrate2Index["lactate"]]
+    if Substrates[_SUBSTRATE2INDEX["acetate"]] != 0:
+        Influxes[8] = -100 * Substrates[_SUBSTRATE2INDEX["acetate"]]
+    if Substrates[_SUBSTRATE2INDEX["lactate"]] != 0:
+        Influxes[26] = -100 * Substrates[_SUBSTRATE2INDEX["lactate"]]
 
     return Influxes
 
+# Name, description and references of special species, keyed by species ID, see special_species
+_SPECIAL_SPECIES = {
+    206: ("Rhodobacter sphaeroides", "Rhodobacter sphaeroides is a kind of purple bacteria that can obtain energy through photosynthesis. It can perform photoheterotrophic, photoautotrophic and chemoheterotrophic growth. It is also able to fix nitrogen and produce hydrogen. Its heterotrophic fluxomic features include: glucose metabolism shows high flux through ED pathway, TCA cycle, pyruvate shunt, and malic enzyme, while cell can perform simultaneous CO2 fixation and glucose catabolism.", ("http://jb.asm.org/content/194/2/274.full.pdf", "http://jb.asm.org/content/187/5/1581.full")),
+    205: ("Dinoroseobacter shibae", # or Phaeobacter gallaeciensis
+"This species belongs to the Rhodobacteraceae. It uses organic substrates as carbon sources and can generate energy from light. Glucose-grown cells catabolize the carbon source exclusively via the ED pathway, whereas glycolysis and the PP pathway are for anabolic purposes only. Pyruvate carboxylase is involved in CO2 assimilation and the TCA cycle is functional.", ("http://bmcmicrobiol.biomedcentral.com/articles/10.1186/1471-2180-9-209",)),
+    204:("Rhodopseudomonas palustris", "Rhodopseudomonas palustris is a purple non-sulfur bacterium and can have four metabolisms: photoautotrophic, photoheterotrophic, chemoautotrophic and chemoheterotrophic. Under photoheterotrophic condition, acetate metabolism is via TCA cycle, highly active glyoxylate shunt and phosphoenolpyruvate carboxykinase, while the Calvin cycle can re-fix CO2 from acetate oxidation. Under photoheterotrophic condition, a nifA* mutant represses its Calvin cycle and produces hydrogen. Non-growing photoheterotrophic cell can increases hydrogen yield from acetate by shifting from the glyoxylate shunt to the TCA cycle.", ("http://www.pnas.org/content/107/26/11669.full", "http://www.jbc.org/content/289/4/1960.full",)),
+    203: ("Synechocystis 6803", "This cyanobacterium can grow photoautotrophic and photoheterotrophic/photomixotrophic (with glucose) conditions. Its photoautotrophic metabolism shows high fluxes through the Calvin Cycle, glycolysis and malic enzyme. Its oxidative pentose phosphate pathway is active, but its TCA cycle is weak and carries minimal fluxes through the GABA shunt. The mutant can uptake xylose and has acetate overflow via the phosphoketolase pathway. Under photomixotrophic condition, cyanobacteria can simultaneously use glucose and CO2. Under photoheterotrophic condition (PSII inactivation), it uses oxidative pentose phosphate pathway to generate NADPH from glucose.", ("http://pcp.oxfordjournals.org/content/55/9/1605.long", "http://www.sciencedirect.com/science/article/pii/S1096717611000887", "http://www.nature.com/articles/nplants201553", "http://jb.asm.org/content/197/5/943.long")),
+    202:("Chlorobaculum tepidum", "This green sulfur bacterial species uses a reversed TCA cycle for CO2 fixation. It can also perform photomixotrophic metabolism using acetate and pyruvate.", ("http://www.jbc.org/content/285/50/39544.short",)),
+    201:("Cyanothece 51142", "This cyanobacterium can fix nitrogen and perform photomixtrophic metabolism using glycerol. It has a broken TCA cycle. The nitrate-deficient condition limits CO2 fixation flux.", ("http://link.springer.com/article/10.1007%2Fs11120-013-9911-5",))
+}
+
 def special_species(ID):
     """Print messages based on special species
     """
-    Dict = {206: ("Rhodobacter sphaeroides", "Rhodobacter sphaeroides is a kind of purple bacteria that can obtain energy through photosynthesis. It can perform photoheterotrophic, photoautotrophic and chemoheterotrophic growth. It is also able to fix nitrogen and produce hydrogen. Its heterotrophic fluxomic features include: glucose metabolism shows high flux through ED pathway, TCA cycle, pyruvate shunt, and malic enzyme, while cell can perform simultaneous CO2 fixation and glucose catabolism.", ("http://jb.asm.org/content/194/2/274.full.pdf", "http://jb.asm.org/content/187/5/1581.full")),
-            205: ("Dinoroseobacter shibae", # or Phaeobacter gallaeciensis
-"This species belongs to the Rhodobacteraceae. It uses organic substrates as carbon sources and can generate energy from light. Glucose-grown cells catabolize the carbon source exclusively via the ED pathway, whereas glycolysis and the PP pathway are for anabolic purposes only. Pyruvate carboxylase is involved in CO2 assimilation and the TCA cycle is functional.", ("http://bmcmicrobiol.biomedcentral.com/articles/10.1186/1471-2180-9-209",)),
-            204:("Rhodopseudomonas palustris", "Rhodopseudomonas palustris is a purple non-sulfur bacterium and can have four metabolisms: photoautotrophic, photoheterotrophic, chemoautotrophic and chemoheterotrophic. Under photoheterotrophic condition, acetate metabolism is via TCA cycle, highly active glyoxylate shunt and phosphoenolpyruvate carboxykinase, while the Calvin cycle can re-fix CO2 from acetate oxidation. Under photoheterotrophic condition, a nifA* mutant represses its Calvin cycle and produces hydrogen. Non-growing photoheterotrophic cell can increases hydrogen yield from acetate by shifting from the glyoxylate shunt to the TCA cycle.", ("http://www.pnas.org/content/107/26/11669.full", "http://www.jbc.org/content/289/4/1960.full",)),
-            203: ("Synechocystis 6803", "This cyanobacterium can grow photoautotrophic and photoheterotrophic/photomixotrophic (with glucose) conditions. Its photoautotrophic metabolism shows high fluxes through the Calvin Cycle, glycolysis and malic enzyme. Its oxidative pentose phosphate pathway is active, but its TCA cycle is weak and carries minimal fluxes through the GABA shunt. The mutant can uptake xylose and has acetate overflow via the phosphoketolase pathway. Under photomixotrophic condition, cyanobacteria can simultaneously use glucose and CO2. Under photoheterotrophic condition (PSII inactivation), it uses oxidative pentose phosphate pathway to generate NADPH from glucose.", ("http://pcp.oxfordjournals.org/content/55/9/1605.long", "http://www.sciencedirect.com/science/article/pii/S1096717611000887", "http://www.nature.com/articles/nplants201553", "http://jb.asm.org/content/197/5/943.long")),
-            202:("Chlorobaculum tepidum", "This green sulfur bacterial species uses a reversed TCA cycle for CO2 fixation. It can also perform photomixotrophic metabolism using acetate and pyruvate.", ("http://www.jbc.org/content/285/50/39544.short",)),
-            201:("Cyanothece 51142", "This cyanobacterium can fix nitrogen and perform photomixtrophic metabolism using glycerol. It has a broken TCA cycle. The nitrate-deficient condition limits CO2 fixation flux.", ("http://link.springer.com/article/10.1007%2Fs11120-013-9911-5",))
-}
     if ID == 207: # These two species are the same
         ID = 205
 
-    (Name, Description, URLs) = Dict[ID]
+    (Name, Description, URLs) = _SPECIAL_SPECIES[ID]
     print("<p><font color=\"red\">The species you selected is special:</font> %s</p>" % Description)
     print("<P>See also:<ul>")
     for URL in URLs:
@@ -443,7 +599,7 @@ def special_species(ID):
 def predict(Vector, Substrates, Boundary_dict, pushLastWords):
     """ Predict and adjust all influx values
     Vector: 1-D list of floats, the feature vector, including substrate matrix, size = 24
-    Substrates: dict of floats, 1-indexed part of Feature_vector, ratio of substrates
+    Substrates: 1-D array of 14 floats, 0-indexed part of Feature_vector, ratio of substrates
     Boundary_dict: Upper boundaries and lower boundaries for 29 fluxes, depending on user inputs,
                    e.g., {"lb29":999, "ub8":50}, populate ub and lb inequalities from them
                    If no boundary set by user, it can be an empty dictionary
@@ -456,32 +612,38 @@ def predict(Vector, Substrates, Boundary_dict, pushLastWords):
         special_species(Vector[0])
         return None
 
-    Models = pickle.load(open("models_svm.p", "rb"))
-    Feature_scalers = pickle.load(open("feature_scalers.p", "rb"))
-    Encoders = pickle.load(open("encoders.p", "rb"))
-    Label_scalers = pickle.load(open("label_scalers.p", "rb"))
+    Models = _get_models()
+    Label_scalers = _get_label_scalers()
+    Encoder_groups, Feature_means, Feature_scales, Label_mins, Label_scales, Label_scale_squares = _get_preprocessing()
 
 #    print "<p>Models, feature and label Scalers and one-hot Encoder loaded..</p>"
     #  Models: dict, keys are influx indexes and values are regression models
 
     T = time.time()
-    Influxes = {}
+    Other_vIDs, Support_vectors, Model_index, Gammas, Dual_coefs, Intercepts, Width = _get_rbf_svrs()
+    Vectors_scaled = numpy.zeros((29, Width)) # row vID-1 is the input of model vID, zero-padded to Width
 #    Influxes = {Iundex:Model.predict(Scalers[Index].transform(Vector))[0] for Index, Model in Models.iteritems()}# use dictionary because influx IDs are not consecutive
 
 #    print "Standardized (zero mean and unit variance) influx prediction from ML:"
-    for vID, Model in Models.items():
-        Vector_local = list(Vector) # make a copy; o/w Vector will be changed in one-hot encoding and standarization for different models
-        categorical_features = [Vector[:6+1]]
-        One_hot_encoding_of_categorical_features =  Encoders[vID].transform(categorical_features).toarray().tolist()[0]  # one-hot encoding for categorical features
-        Vector_local =  One_hot_encoding_of_categorical_features + Vector_local[6+1:] # combine one-hot-encoded categorical features with continuous features (including substrate matrix)
-        Vector_local = Feature_scalers[vID].transform([Vector_local]) # standarization of features
-#        print Vector_local
-        Influx_local = Model.predict(Vector_local) # prediction
-        Influx_local = Label_scalers[vID].inverse_transform([Influx_local])
-        Influxes[vID] = Influx_local[0][0]  # double index added 2022-7-1
-
-
-    Influxes = quadprog_adjust(Substrates, Influxes, Boundary_dict, pushLastWords, Label_scalers=Label_scalers, Debug=True)
+    categorical_features = Vector[:6+1]
+    continuous_features = numpy.asarray(Vector[6+1:], dtype=numpy.float64) # converted once, shared by all encoder groups
+    for Categories, Offsets, vIDs in Encoder_groups: # one-hot encoding done once for all models sharing an encoder
+        One_hot_encoding_of_categorical_features = _onehot(categorical_features, Categories, Offsets) # one-hot encoding for categorical features
+        Vector_encoded = numpy.concatenate([One_hot_encoding_of_categorical_features, continuous_features]) # combine one-hot-encoded categorical features with continuous features (including substrate matrix)
+        for vID in vIDs:
+            Vectors_scaled[vID-1, :len(Vector_encoded)] = (Vector_encoded - Feature_means[vID]) / Feature_scales[vID] # standarization of features
+
+    # prediction of all RBF-kernel SVRs at once, see _get_rbf_svrs
+    Diff = Vectors_scaled[Model_index] - Support_vectors
+    Kernel = numpy.exp(-Gammas * numpy.einsum("md,md->m", Diff, Diff))
+    Scaled_influxes = numpy.bincount(Model_index, weights=Kernel * Dual_coefs, minlength=29) + Intercepts
+    for vID in Other_vIDs:
+        Scaled_influxes[vID-1] = Models[vID].predict(Vectors_scaled[vID-1, None, :Models[vID].n_features_in_])[0]
+
+    Influxes = (Scaled_influxes - Label_mins) / Label_scales # inverse transform of label scaling, Influxes[i] is v_{i+1}
+
+
+    Influxes = quadprog_adjust(Substrates, Influxes, Boundary_dict, pushLastWords, Label_scalers=Label_scalers, Label_scale_squares=Label_scale_squares, Debug=True)
     Influxes = rule_adjust(Influxes, Substrates)
 
     T = time.time() -T
@@ -493,3 +655,15 @@ def predict(Vector, Substrates, Boundary_dict, pushLastWords):
     <p>Standardization and Regression done in %.5f seconds.</p>
     """ % T)
     return Influxes
+
+# Warm up the caches at import so that the first request pays no disk I/O nor precomputation.
+# Pickles are produced by get_model.py and may not exist yet, e.g., before training.
+try:
+    _get_models()
+    _get_feature_scalers()
+    _get_encoders()
+    _get_label_scalers()
+    _get_preprocessing()
+    _get_rbf_svrs()
+except FileNotFoundError:
+    pass
@@ -356,19 +356,19 @@ def mflux(
     # Boundary_dict = libflux.process_boundaries(request, Substrates)
     # No bro
     Substrate2Index = {
-        "glucose": 1,
-        "galactose": 3,
-        "fructose": 2,
-        "gluconate": 4,
-        "glutamate": 5,
-        "citrate": 6,
-        "xylose": 7,
-        "succinate": 8,
-        "malate": 9,
-        "lactate": 10,
-        "pyruvate": 11,
-        "glycerol": 12,
-        "acetate": 13
+        "glucose": 0,
+        "galactose": 2,
+        "fructose": 1,
+        "gluconate": 3,
+        "glutamate": 4,
+        "citrate": 5,
+        "xylose": 6,
+        "succinate": 7,
+        "malate": 8,
+        "lactate": 9,
+        "pyruvate": 10,
+        "glycerol": 11,
+        "acetate": 12
     }
     Feature_names = ["".join([Bound, ID]) for (Bound, ID) in itertools.product(["lb", "ub"], list(map(str, list(range(1, 29+1)))))]
     Features = {}
@@ -0,0 +1,215 @@
+"""Cross-validate the quadprog solution of quadprog_adjust against cvxopt
+and the vectorized prediction of predict against the per-model sklearn pipeline
+
+Run with: python -m pytest test_libflux.py
+"""
+
+import itertools
+
+import numpy
+import pytest
+import sklearn.preprocessing
+import sklearn.svm
+
+import libflux
+
+# Predicted fluxes of the example in quadprog_adjust's docstring, Fluxes[i] is v_{i+1}
+FLUXES = numpy.array([100.0, -2.7159, 15.2254, 17.7016, 110.9973, 91.8578, 137.7961, 91.1558, -0.7373, 94.1518,
+    24.1126, 21.231, 2.8816, 11.0324, 10.1986, 11.0324, 79.4203, 79.4203, 67.9442, 67.8806,
+    79.3567, 79.3567, 64.0876, 11.4761, 70.0392, -1.2424, 0.0059, 23.2159, 26.7451])
+
+# cvxopt options converging far tighter than quadprog_adjust's fallback, used as the reference
+TIGHT_QP_OPTIONS = {'show_progress': False, 'abstol': 1e-12, 'reltol': 1e-12, 'feastol': 1e-12, 'maxiters': 500}
+
+
+def substrates(**Ratios):
+    """Substrate vector from ratios keyed by substrate names, e.g., substrates(glucose=0.7, acetate=0.3)"""
+    Substrates = numpy.zeros(14)
+    for Name, Ratio in Ratios.items():
+        Substrates[libflux._SUBSTRATE2INDEX[Name]] = Ratio
+    return Substrates
+
+
+def label_scalers():
+    """MinMaxScalers mapping each flux range [_LBS[i], _UBS[i]] to [0, 1], keyed by influx ID"""
+    return {i+1: sklearn.preprocessing.MinMaxScaler().fit([[Lb], [Ub]]) for i, (Lb, Ub) in enumerate(zip(libflux._LBS, libflux._UBS))}
+
+
+def objective(Solution, Label_scalers):
+    """1/2 x^T P x + q^T x of quadprog_adjust, where P is diagonal and q = -P * FLUXES"""
+    P_diag = numpy.ones(29) if Label_scalers is None else numpy.array([Label_scalers[i].scale_[0]**2 for i in range(1, 29+1)])
+    return 0.5 * P_diag @ Solution**2 - P_diag @ (FLUXES * Solution)
+
+
+def inconsistent(*args, **kwargs):
+    raise ValueError("constraints are inconsistent, no solution")
+
+
+CASES = [
+    (substrates(glucose=1), {}),
+    (substrates(glucose=0.7, acetate=0.3), {"ub8": 150.0}),
+    (substrates(lactate=0.6, glycerol=0.4), {"lb29": 10.0, "ub20": 60.0}), # organic acids trigger
+    (substrates(xylose=0.5, citrate=0.5), {"ub5": 100.0, "lb17": 85.0}),
+]
+
+
+@pytest.mark.parametrize("Substrates, Boundary_dict", CASES)
+@pytest.mark.parametrize("Scaled", [False, True])
+def test_quadprog_matches_cvxopt(monkeypatch, Substrates, Boundary_dict, Scaled):
+    Label_scalers = label_scalers() if Scaled else None
+    Solution = libflux.quadprog_adjust(Substrates, FLUXES, Boundary_dict, None, Label_scalers=Label_scalers)
+
+    # Same problem through the cvxopt fallback, converged tightly
+    monkeypatch.setattr(libflux.quadprog, "solve_qp", inconsistent)
+    monkeypatch.setattr(libflux, "_QP_OPTIONS", TIGHT_QP_OPTIONS)
+    Reference = libflux.quadprog_adjust(Substrates, FLUXES, Boundary_dict, None, Label_scalers=Label_scalers)
+
+    # the objective is flat along some constraints, so fluxes agree less closely than the objective,
+    # where the active set method of quadprog ends at least as low as the interior point method of cvxopt
+    numpy.testing.assert_allclose(Solution, Reference, atol=1e-3)
+    assert objective(Solution, Label_scalers) <= objective(Reference, Label_scalers) + 1e-9 * abs(objective(Reference, Label_scalers))
+
+
+@pytest.mark.parametrize("Substrates, Boundary_dict", CASES)
+def test_standard_label_scalers_weigh_by_scale(Substrates, Boundary_dict):
+    # P is diag(scale_**2) for any label scaler, so StandardScalers weigh fluxes by their squared std,
+    # the same as MinMaxScalers whose scale_ equals that std
+    Standard_scalers = {i+1: sklearn.preprocessing.StandardScaler().fit([[Lb], [Ub]]) for i, (Lb, Ub) in enumerate(zip(libflux._LBS, libflux._UBS))}
+    MinMax_scalers = {i: sklearn.preprocessing.MinMaxScaler().fit([[0], [1 / Scaler.scale_[0]]]) for i, Scaler in Standard_scalers.items()}
+
+    Solution = libflux.quadprog_adjust(Substrates, FLUXES, Boundary_dict, None, Label_scalers=Standard_scalers)
+    Reference = libflux.quadprog_adjust(Substrates, FLUXES, Boundary_dict, None, Label_scalers=MinMax_scalers)
+
+    numpy.testing.assert_allclose(Solution, Reference, atol=1e-6)
+
+
+def test_precomputed_label_scale_squares():
+    Label_scalers = label_scalers()
+    Label_scale_squares = numpy.array([Label_scalers[i].scale_[0] for i in range(1, 29+1)])**2
+    for Substrates, Boundary_dict in CASES:
+        numpy.testing.assert_array_equal(
+            libflux.quadprog_adjust(Substrates, FLUXES, Boundary_dict, None, Label_scalers=Label_scalers, Label_scale_squares=Label_scale_squares),
+            libflux.quadprog_adjust(Substrates, FLUXES, Boundary_dict, None, Label_scalers=Label_scalers))
+
+
+def test_infeasible_boundaries_fall_back_to_cvxopt(monkeypatch):
+    Calls = []
+    qp = libflux.cvxopt.solvers.qp
+    monkeypatch.setattr(libflux.cvxopt.solvers, "qp", lambda *args, **kwargs: Calls.append(args) or qp(*args, **kwargs))
+
+    # v1 equals 100 times the glucose ratio, which contradicts ub1
+    try:
+        libflux.quadprog_adjust(substrates(glucose=1), FLUXES, {"ub1": 50.0}, None)
+    except ValueError: # cvxopt may break down on infeasible problems, as it always did
+        pass
+
+    assert len(Calls) == 1
+
+
+def test_other_quadprog_errors_are_raised(monkeypatch):
+    def not_positive_definite(*args, **kwargs):
+        raise ValueError("matrix G is not positive definite")
+    monkeypatch.setattr(libflux.quadprog, "solve_qp", not_positive_definite)
+
+    with pytest.raises(ValueError, match="not positive definite"):
+        libflux.quadprog_adjust(substrates(glucose=1), FLUXES, {}, None)
+
+
+# Number of categories of the 7 categorical features of the synthetic pipeline, see synthetic_pipeline
+NUM_CATEGORIES = [3, 2, 3, 2, 2, 3, 2]
+NARROW_vIDs = [2, 5, 11, 23] # encoders fitted without category 3 of the first feature, thus fewer features
+LINEAR_vID = 7 # not an RBF-kernel SVR
+
+
+@pytest.fixture
+def synthetic_pipeline(monkeypatch):
+    """Tiny models, encoders and scalers fitted like get_model.py on synthetic data, in place of the pickles
+
+    Models of NARROW_vIDs have fewer features than the others, model LINEAR_vID has a linear kernel
+    and a few label scalers are StandardScalers.
+    """
+    RNG = numpy.random.RandomState(0)
+    Num_samples = 40
+    Categorical = numpy.column_stack([RNG.permutation(numpy.arange(Num_samples) % Num) + 1 for Num in NUM_CATEGORIES]).astype(float)
+    Continuous = RNG.rand(Num_samples, 17)
+
+    Models, Feature_scalers, Encoders, Label_scalers = {}, {}, {}, {}
+    for vID in range(1, 29+1):
+        Rows = Categorical[:, 0] != 3 if vID in NARROW_vIDs else numpy.ones(Num_samples, dtype=bool)
+        Encoder = sklearn.preprocessing.OneHotEncoder().fit(Categorical[Rows])
+        Features = numpy.hstack([Encoder.transform(Categorical[Rows]).toarray(), Continuous[Rows]])
+        Feature_scaler = sklearn.preprocessing.StandardScaler().fit(Features)
+        Labels = (Features @ RNG.randn(Features.shape[1]) * 10 + 50).reshape(-1, 1)
+        Label_scaler = (sklearn.preprocessing.StandardScaler() if vID % 5 == 0 else sklearn.preprocessing.MinMaxScaler()).fit(Labels)
+        Model = sklearn.svm.SVR(kernel="linear") if vID == LINEAR_vID else sklearn.svm.SVR(gamma="scale" if vID % 2 else 0.05)
+        Model.fit(Feature_scaler.transform(Features), Label_scaler.transform(Labels).ravel())
+        Models[vID], Feature_scalers[vID], Encoders[vID], Label_scalers[vID] = Model, Feature_scaler, Encoder, Label_scaler
+
+    for Name, Value in [("_get_models", Models), ("_get_feature_scalers", Feature_scalers), ("_get_encoders", Encoders), ("_get_label_scalers", Label_scalers)]:
+        monkeypatch.setattr(libflux, Name, lambda Value=Value: Value)
+    libflux._get_preprocessing.cache_clear()
+    libflux._get_rbf_svrs.cache_clear()
+    yield Models, Feature_scalers, Encoders, Label_scalers
+    libflux._get_preprocessing.cache_clear()
+    libflux._get_rbf_svrs.cache_clear()
+
+
+def feature_vector(Categorical, RNG):
+    """Feature vector in the order of process_input, with the given categorical features"""
+    return list(Categorical) + RNG.rand(17).tolist()
+
+
+def sklearn_influxes(Vector, Models, Feature_scalers, Encoders, Label_scalers):
+    """Influxes predicted model by model through the sklearn objects, as before vectorization"""
+    Influxes = numpy.zeros(29)
+    for vID in range(1, 29+1):
+        Vector_encoded = numpy.hstack([Encoders[vID].transform([Vector[:6+1]]).toarray()[0], Vector[6+1:]])
+        Scaled = Models[vID].predict(Feature_scalers[vID].transform([Vector_encoded]))
+        Influxes[vID-1] = Label_scalers[vID].inverse_transform(Scaled.reshape(-1, 1))[0, 0]
+    return Influxes
+
+
+def predicted_influxes(monkeypatch, Vector):
+    """Influxes of predict before they are adjusted by quadprog_adjust"""
+    Captured = []
+    monkeypatch.setattr(libflux, "quadprog_adjust", lambda Substrates, Fluxes, *args, **kwargs: Captured.append(Fluxes.copy()) or Fluxes)
+    libflux.predict(Vector, numpy.zeros(14), {}, [].append)
+    return Captured[0]
+
+
+def test_vectorized_svrs_match_sklearn(monkeypatch, synthetic_pipeline):
+    Models, Feature_scalers, Encoders, Label_scalers = synthetic_pipeline
+    Other_vIDs, Support_vectors, Model_index, Gammas, Dual_coefs, Intercepts, Width = libflux._get_rbf_svrs()
+    assert Other_vIDs == [LINEAR_vID]
+    assert Width > Models[NARROW_vIDs[0]].n_features_in_ # narrow models are zero-padded
+
+    RNG = numpy.random.RandomState(1)
+    for Categorical in [[1, 1, 1, 1, 1, 1, 1], [2, 2, 3, 2, 1, 3, 2], [1, 2, 2, 1, 2, 2, 1]]:
+        Vector = feature_vector(Categorical, RNG)
+        numpy.testing.assert_allclose(predicted_influxes(monkeypatch, Vector), sklearn_influxes(Vector, *synthetic_pipeline), rtol=1e-9, atol=1e-9)
+
+
+def test_encoders_grouped_by_categories(synthetic_pipeline):
+    Encoder_groups = libflux._get_preprocessing()[0]
+    assert sorted(vIDs for _, _, vIDs in Encoder_groups) == [sorted(set(range(1, 29+1)) - set(NARROW_vIDs)), NARROW_vIDs]
+
+
+def test_onehot_matches_encoder_transform(synthetic_pipeline):
+    Encoders = synthetic_pipeline[2]
+    for Categories, Offsets, vIDs in libflux._get_preprocessing()[0]:
+        for Categorical in itertools.product(*Categories):
+            numpy.testing.assert_array_equal(libflux._onehot(Categorical, Categories, Offsets), Encoders[vIDs[0]].transform([Categorical]).toarray()[0])
+
+
+def test_unknown_category_raises(monkeypatch, synthetic_pipeline):
+    for Categories, Offsets, vIDs in libflux._get_preprocessing()[0]:
+        for Categorical in [[1, 1, 1, 1, 1, 4, 1], [1, 1, 1, 1, 1, 1.5, 1], [0, 1, 1, 1, 1, 1, 1]]: # above, between and below categories
+            with pytest.raises(ValueError, match="unknown categories"):
+                libflux._onehot(Categorical, Categories, Offsets)
+
+    # category 3 of the first feature is known to some encoders only, which the encoders also reject
+    Vector = feature_vector([3, 1, 1, 1, 1, 1, 1], numpy.random.RandomState(2))
+    with pytest.raises(ValueError):
+        synthetic_pipeline[2][NARROW_vIDs[0]].transform([Vector[:6+1]])
+    with pytest.raises(ValueError, match="unknown categories"):
+        predicted_influxes(monkeypatch, Vector)